@@ -0,0 +1,40 @@
+from typing import Dict, Tuple
+
+from rlbot.utils.game_state_util import BallState, CarState, Physics, Vector3, Rotator
+
+# Shared by every CarState we build.
+ZERO_VEC = Vector3(0, 0, 0)
+ZERO_ROT = Rotator(0, 0, 0)
+
+# Keeps the ball above the roof of the arena, out of the way.
+HIDDEN_BALL = BallState(physics=Physics(location=Vector3(0, 0, 3000),
+                                        velocity=ZERO_VEC,
+                                        angular_velocity=ZERO_VEC))
+
+_CAR_STATE_POOL: Dict[Tuple[float, float, float, float, float, float], CarState] = {}
+
+
+def stationary_car_state(x: float, y: float, z: float,
+                         pitch: float = 0.0, yaw: float = 0.0, roll: float = 0.0) -> CarState:
+    """Places a car at the given location and rotation, at rest.
+
+    Identical states are shared, so formations which are set more than once only build their states once.
+    Don't modify the returned CarState.
+
+    Arguments:
+        x, y, z {float} -- World location of the car.
+        pitch, yaw, roll {float} -- Rotation of the car.
+
+    Returns:
+        CarState -- The shared CarState for that location and rotation.
+    """
+    key = (x, y, z, pitch, yaw, roll)
+    car_state = _CAR_STATE_POOL.get(key)
+    if car_state is None:
+        rotation = ZERO_ROT if pitch == yaw == roll == 0 else Rotator(pitch, yaw, roll)
+        car_state = CarState(Physics(location=Vector3(x, y, z),
+                                     velocity=ZERO_VEC,
+                                     angular_velocity=ZERO_VEC,
+                                     rotation=rotation))
+        _CAR_STATE_POOL[key] = car_state
+    return car_state
@@ -1,17 +1,55 @@
-from typing import Set, List
+from typing import Set, List, Dict
 
+import numpy as np
+from rlbot.utils.game_state_util import GameState, CarState, BallState
 from rlbot.utils.structures.game_data_struct import GameTickPacket
+from rlbot.utils.structures.game_interface import GameInterface
 
-from choreography.drone import Drone
+from choreography.drone import Drone, LazyOrientations
 
 
-class Choreography:
+class GameStateBatcher:
+    """
+    Collects the game state changes made during a tick so they can be sent with a single
+    set_game_state call, instead of one call for every step that wants to move something.
+    """
 
     def __init__(self):
+        self.car_states: Dict[int, CarState] = {}
+        self.ball_state: BallState = None
+
+    def queue_cars(self, car_states: Dict[int, CarState]):
+        self.car_states.update(car_states)
+
+    def queue_ball(self, ball_state: BallState):
+        self.ball_state = ball_state
+
+    def flush(self, game_interface: GameInterface):
+        """Sends everything queued since the last flush, if there is anything."""
+        if not self.car_states and self.ball_state is None:
+            return
+        game_interface.set_game_state(GameState(ball=self.ball_state, cars=self.car_states or None))
+        self.car_states = {}
+        self.ball_state = None
+
+
+class Choreography:
+
+    def __init__(self, game_interface: GameInterface = None):
+        # Older subclasses call super().__init__() and set game_interface themselves.
+        self.game_interface = game_interface
+        self.batcher = GameStateBatcher()
         self.sequence = []
         self.sequence_index = 0
         self.finished = False
 
+        # Every drone's position and velocity, row i belonging to drones[i].
+        # The hivemind points these at its own arrays, which it refreshes each tick.
+        self.positions: np.ndarray = np.zeros((0, 3), dtype=np.float32)
+        self.velocities: np.ndarray = np.zeros((0, 3), dtype=np.float32)
+        # Their orientation matrices. Call refresh() before reading the matrices.
+        self.orientations: LazyOrientations = LazyOrientations(np.zeros((0, 3), dtype=np.float32))
+
     def step(self, packet: GameTickPacket, drones: List[Drone]):
         self.pre_step(drones)
         if self.sequence_index < len(self.sequence):
@@ -21,6 +59,7 @@ class Choreography:
                 self.sequence_index += 1
         else:
             self.finished = True
+        self.batcher.flush(self.game_interface)
 
     def generate_sequence(self, drones: List[Drone]):
         pass
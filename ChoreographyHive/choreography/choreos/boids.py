@@ -3,14 +3,30 @@ from typing import List
 import numpy as np
 
 from rlbot.agents.base_agent import SimpleControllerState
-from rlbot.utils.game_state_util import GameState, CarState, Physics, Vector3, Rotator, BallState
+from rlbot.utils.game_state_util import CarState, Physics, Vector3, Rotator
 from rlbot.utils.structures.game_interface import GameInterface
 
+from choreography.car_state_pool import HIDDEN_BALL
 from choreography.choreography import Choreography
 from choreography.drone import seek_pos, normalise, Drone
 from choreography.group_step import BlindBehaviorStep, DroneListStep, StepResult, PerDroneStep
 
 
+# Boid parameters.
+PERCEPTION_DIS = 800
+ALIGNMENT_MUL = 100
+COHESION_MUL = 150
+SEPARATION_MUL = 200
+AVOID_WALL_MUL = 500
+
+PERCEPTION_DIS_SQ = PERCEPTION_DIS**2
+
+# Push away from the walls, already normalised and scaled by AVOID_WALL_MUL. Indexed by which side of the
+# field the drone is on in x and y: 0 near the negative wall, 1 in the middle, 2 near the positive wall.
+AVOID_WALLS = AVOID_WALL_MUL * np.array([[normalise(np.array([1 - x_side, 1 - y_side, 0.0])) for y_side in range(3)]
+                                         for x_side in range(3)])
+
+
 class Boids(Choreography):
     """
     Boids in RLBot!
@@ -19,8 +35,7 @@ class Boids(Choreography):
     """
 
     def __init__(self, game_interface: GameInterface):
-        super().__init__()
-        self.game_interface = game_interface
+        super().__init__(game_interface)
 
     def generate_sequence(self, drones: List[Drone]):
         self.sequence.clear()
@@ -34,10 +49,7 @@ class Boids(Choreography):
         """
         Places the ball above the roof of the arena to keep it out of the way.
         """
-        self.game_interface.set_game_state(GameState(ball=BallState(physics=Physics(
-            location=Vector3(0, 0, 3000),
-            velocity=Vector3(0, 0, 0),
-            angular_velocity=Vector3(0, 0, 0)))))
+        self.batcher.queue_ball(HIDDEN_BALL)
         return StepResult(finished=True)
 
 
@@ -55,7 +67,7 @@ class Boids(Choreography):
                 Physics(location=Vector3(x, y, 20),
                         velocity=Vector3(0, 0, 0),
                         rotation=Rotator(0, rot, 0)))
-        self.game_interface.set_game_state(GameState(cars=car_states))
+        self.batcher.queue_cars(car_states)
 
         return StepResult(finished=True)
 
@@ -64,54 +76,38 @@ class Boids(Choreography):
         """
         Controls the drones to act like boids.
         """
-        # Parameters:
-        PERCEPTION_DIS = 800
-        ALIGNMENT_MUL = 100
-        COHESION_MUL = 150
-        SEPARATION_MUL = 200
-        AVOID_WALL_MUL = 500
-
-        for drone in drones:
-            # Resetting drone controller.
-            drone.ctrl = SimpleControllerState()
-
-            # Creating "forces"
-            alignment_vec = np.zeros(3)
-            cohesion_vec = np.zeros(3)
-            separation_vec = np.zeros(3)
-            avoid_walls_vec = np.zeros(3)
+        # Everyone's position and velocity, so the neighbour search can be done with array ops.
+        positions = self.positions
+        velocities = self.velocities
 
-            others = 0 # The amount of drones in perception dist.
-            for other in drones:
-                # Skip if the other is also the drone.
-                if other is drone: continue
+        # Squared distances between every pair of drones, using |p - q|^2 = p.p + q.q - 2 p.q.
+        # This loses precision at field-scale coordinates, so it is only used for the neighbour check.
+        squared_norms = np.einsum('ij,ij->i', positions, positions)
+        distances_sq = squared_norms[:, None] + squared_norms[None, :] - 2 * positions @ positions.T
+        np.maximum(distances_sq, 0, out=distances_sq)
 
-                other_to_drone = drone.pos - other.pos
-                distance = np.linalg.norm(other_to_drone)
+        # The drones in perception dist of each drone, not counting the drone itself.
+        neighbours = distances_sq <= PERCEPTION_DIS_SQ
+        np.fill_diagonal(neighbours, False)
 
-                # Skip if other is too far.
-                if distance > PERCEPTION_DIS: continue
+        for i, drone in enumerate(drones):
+            # Resetting drone controller.
+            drone.ctrl = SimpleControllerState()
 
-                # Increment others.
-                others += 1
+            nearby = neighbours[i]
+            others = np.count_nonzero(nearby)
+            others_to_drone = drone.pos - positions[nearby]
 
-                # Alignment
-                alignment_vec += other.vel
-                # Cohesion
-                cohesion_vec += other.pos
-                # Separation
-                separation_vec += other_to_drone / distance**2
+            # Creating "forces"
+            alignment_vec = velocities[nearby].sum(axis=0)
+            cohesion_vec = positions[nearby].sum(axis=0)
+            others_dist_sq = np.einsum('ij,ij->i', others_to_drone, others_to_drone)
+            separation_vec = (others_to_drone / others_dist_sq[:, None]).sum(axis=0)
 
             # Avoid Walls.
-            if drone.pos[0] < -2800:
-                avoid_walls_vec += np.array([1,0,0])
-            elif drone.pos[0] > 2800:
-                avoid_walls_vec += np.array([-1,0,0])
-
-            if drone.pos[1] < -3800:
-                avoid_walls_vec += np.array([0,1,0])
-            elif drone.pos[1] > 3800:
-                avoid_walls_vec += np.array([0,-1,0])
+            x_side = 0 if drone.pos[0] < -2800 else 2 if drone.pos[0] > 2800 else 1
+            y_side = 0 if drone.pos[1] < -3800 else 2 if drone.pos[1] > 3800 else 1
+            avoid_walls_vec = AVOID_WALLS[x_side, y_side]
 
             # Averaging out cohesion_vec
             # and making it relative to drone.
@@ -123,7 +119,7 @@ class Boids(Choreography):
             target += ALIGNMENT_MUL * normalise(alignment_vec)
             target += COHESION_MUL * normalise(cohesion_vec)
             target += SEPARATION_MUL * normalise(separation_vec)
-            target += AVOID_WALL_MUL * normalise(avoid_walls_vec)
+            target += avoid_walls_vec
 
             target += drone.pos
 
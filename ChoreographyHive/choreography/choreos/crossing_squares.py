@@ -1,15 +1,48 @@
-from typing import List
+import math
+from typing import Dict, List, Tuple
 
 import numpy as np
 
 from rlbot.agents.base_agent import SimpleControllerState
-from rlbot.utils.game_state_util import GameState, CarState, Physics, Vector3, Rotator, BallState
+from rlbot.utils.game_state_util import CarState
 from rlbot.utils.structures.game_interface import GameInterface
 
+from choreography.car_state_pool import HIDDEN_BALL, stationary_car_state
 from choreography.choreography import Choreography
 from choreography.drone import slow_to_pos, Drone
 from choreography.group_step import BlindBehaviorStep, DroneListStep, StepResult, PerDroneStep
 
+# When each of the four rows in a square starts driving, relative to the start of delayed_start.
+ROW_START_TIMES = (np.arange(4) * 0.9).tolist()
+
+
+def square_car_states(indices: Tuple[int, ...]) -> Dict[int, CarState]:
+    """
+    Builds the states for two squares facing each other, the first 16 drones in one and the rest in the other.
+    """
+    spacing = 250
+    y_offset = 2550
+    x_offset = 3 * spacing / 2
+
+    car_states = {}
+    for i, index in enumerate(indices[:16]):
+        car_states[index] = stationary_car_state(
+            x_offset - spacing*(i % 4), -y_offset - spacing*(i // 4), 20, yaw=np.pi/2)
+
+    for i, index in enumerate(indices[16:]):
+        car_states[index] = stationary_car_state(
+            -x_offset + spacing*(i % 4), y_offset + spacing*(i // 4), 20, yaw=-np.pi/2)
+
+    return car_states
+
+
+def speed_control(drone: Drone) -> float:
+    """
+    Simple speed controller which keeps the drone at a ground speed of about 650 uu/s.
+    """
+    ground_speed_sq = drone.vel[0]*drone.vel[0] + drone.vel[1]*drone.vel[1]
+    return 0 if ground_speed_sq > 650**2 else 0.7
+
 
 class CrossingSquares(Choreography):
     """
@@ -17,8 +50,7 @@ class CrossingSquares(Choreography):
     """
 
     def __init__(self, game_interface: GameInterface):
-        super().__init__()
-        self.game_interface = game_interface
+        super().__init__(game_interface)
 
     def generate_sequence(self, drones: List[Drone]):
         self.sequence.clear()
@@ -40,10 +72,7 @@ class CrossingSquares(Choreography):
         """
         Places the ball above the roof of the arena to keep it out of the way.
         """
-        self.game_interface.set_game_state(GameState(ball=BallState(physics=Physics(
-            location=Vector3(0, 0, 3000),
-            velocity=Vector3(0, 0, 0),
-            angular_velocity=Vector3(0, 0, 0)))))
+        self.batcher.queue_ball(HIDDEN_BALL)
         return StepResult(finished=True)
 
 
@@ -55,13 +84,9 @@ class CrossingSquares(Choreography):
         y_increment = 100
         start_y = -len(drones) * y_increment / 2
         start_z = 40
-        car_states = {}
-        for drone in drones:
-            car_states[drone.index] = CarState(
-                Physics(location=Vector3(start_x, start_y + drone.index * y_increment, start_z),
-                        velocity=Vector3(0, 0, 0),
-                        rotation=Rotator(0, 0, 0)))
-        self.game_interface.set_game_state(GameState(cars=car_states))
+        car_states = {drone.index: stationary_car_state(start_x, start_y + drone.index * y_increment, start_z)
+                      for drone in drones}
+        self.batcher.queue_cars(car_states)
         return StepResult(finished=True)
 
 
@@ -72,24 +97,8 @@ class CrossingSquares(Choreography):
         self.squareA = drones[:16]
         self.squareB = drones[16:]
 
-        spacing = 250
-        y_offset = 2550
-        x_offset = 3 * spacing / 2
-
-        car_states = {}
-        for i, drone in enumerate(self.squareA):
-            car_states[drone.index] = CarState(
-                Physics(location=Vector3(x_offset - spacing*(i % 4), -y_offset - spacing*(i // 4), 20),
-                        velocity=Vector3(0, 0, 0),
-                        rotation=Rotator(0, np.pi/2, 0)))
-
-        for i, drone in enumerate(self.squareB):
-            car_states[drone.index] = CarState(
-                Physics(location=Vector3(-x_offset + spacing*(i % 4), y_offset + spacing*(i // 4), 20),
-                        velocity=Vector3(0, 0, 0),
-                        rotation=Rotator(0, -np.pi/2, 0)))
-
-        self.game_interface.set_game_state(GameState(cars=car_states))
+        car_states = square_car_states(tuple(drone.index for drone in drones))
+        self.batcher.queue_cars(car_states)
         return StepResult(finished=True)
 
 
@@ -100,13 +109,11 @@ class CrossingSquares(Choreography):
         elapsed = packet.game_info.seconds_elapsed - start_time
 
         for drone in drones:
-            throttle_start = (drone.index % 16 // 4) * 0.9
+            throttle_start = ROW_START_TIMES[drone.index % 16 // 4]
             drone.ctrl = SimpleControllerState()
 
             if throttle_start < elapsed:
-                # Speed controller.
-                vel = np.linalg.norm(drone.vel*np.array([1,1,0]))
-                drone.ctrl.throttle = 0 if vel > 650 else 0.7
+                drone.ctrl.throttle = speed_control(drone)
 
         return StepResult(finished=elapsed > 3.6)
 
@@ -120,29 +127,18 @@ class CrossingSquares(Choreography):
         hold = 0.05
         buffer = 0.65
 
+        # Jumps happen in windows of length hold, every buffer seconds. Even drones jump in the
+        # even windows and odd drones in the odd ones, seven windows in total.
+        window = math.floor((elapsed - start) / buffer)
+        window_start = start + window*buffer
+        jumping = window_start < elapsed < window_start+hold and 0 <= window <= 6
+        jumping_parity = window % 2
+
         for drone in drones:
             drone.ctrl = SimpleControllerState()
 
-            # Speed controller.
-            vel = np.linalg.norm(drone.vel*np.array([1,1,0]))
-            drone.ctrl.throttle = 0 if vel > 650 else 0.7
-
-            if (drone.index % 2 == 0):
-                if start < elapsed < start+hold:
-                    drone.ctrl.jump = True
-                elif start+2*buffer < elapsed < start+2*buffer+hold:
-                    drone.ctrl.jump = True
-                elif start+4*buffer < elapsed < start+4*buffer+hold:
-                    drone.ctrl.jump = True
-                elif start+6*buffer < elapsed < start+6*buffer+hold:
-                    drone.ctrl.jump = True
-            else:
-                if start+buffer < elapsed < start+buffer+hold:
-                    drone.ctrl.jump = True
-                elif start+3*buffer < elapsed < start+3*buffer+hold:
-                    drone.ctrl.jump = True
-                elif start+5*buffer < elapsed < start+5*buffer+hold:
-                    drone.ctrl.jump = True
+            drone.ctrl.throttle = speed_control(drone)
+            drone.ctrl.jump = jumping and drone.index % 2 == jumping_parity
 
         return StepResult(finished=elapsed > start+8*buffer)
 
@@ -1,6 +1,6 @@
-from typing import List
+from functools import lru_cache
+from typing import Callable, List, Tuple
 
-from rlbot.utils.game_state_util import GameState
 from rlbot.utils.structures.game_data_struct import GameTickPacket
 from rlbot.utils.structures.game_interface import GameInterface
 
@@ -12,25 +12,38 @@ from cnc.gcode_parser import GCodeParser, BotCnc
 from util.vec import Vec3
 
 
+@lru_cache(maxsize=4)
+def parse_cnc_file(file_name: str, origin: Tuple[float, float, float], normal: Tuple[float, float, float],
+                   scale: float, speed: float) -> BotCnc:
+    """
+    Parses a G-code file into a BotCnc. Results are cached, so repeated calls with the same
+    arguments return the same BotCnc.
+    """
+    return GCodeParser().parse_file(file_name, Vec3(*origin), Vec3(*normal), scale, speed)
+
+
 class LettersChoreography(Choreography):
 
     def __init__(self, game_interface: GameInterface):
-        super().__init__()
-        self.game_interface = game_interface
+        super().__init__(game_interface)
         self.bot_cnc: BotCnc = None
         self.cnc_extruders: List[CncExtruder] = []
+        # (start time, factory) for every extruder in start-time order, and how many have been created.
+        self.pending_extruders: List[Tuple[float, Callable[[], CncExtruder]]] = []
+        self.next_extruder = 0
 
     def pre_step(self, drones: List[Drone]):
         pass  # Allow drones to maintain their controls state.
 
     def generate_sequence(self, drones: List[Drone]):
-
-        parser = GCodeParser()
         # This rlbot.nc is a G-code file created using StickFont: http://ncplot.com/stickfont/stickfont.htm
-        self.bot_cnc = parser.parse_file('./cnc/rlbot.nc', Vec3(-3000, 0, 1400), Vec3(0, 0, 1), 150, 2000)
+        self.bot_cnc = parse_cnc_file('./cnc/rlbot.nc', (-3000, 0, 1400), (0, 0, 1), 150, 2000)
 
-        for drone in drones:
-            self.cnc_extruders.append(CncExtruder([drone], self.bot_cnc))
+        # Each extruder starts a second after the previous one, and is only created when it starts.
+        self.cnc_extruders = []
+        self.pending_extruders = [(float(i), lambda drone=drone: CncExtruder([drone], self.bot_cnc))
+                                  for i, drone in enumerate(drones)]
+        self.next_extruder = 0
 
         self.sequence.clear()
         self.sequence.append(DroneListStep(self.run_cnc))
@@ -38,14 +51,20 @@ class LettersChoreography(Choreography):
     def run_cnc(self, packet: GameTickPacket, drones: List[Drone], start_time) -> StepResult:
         game_time = packet.game_info.seconds_elapsed
         elapsed = game_time - start_time
+
+        pending = self.pending_extruders
+        while self.next_extruder < len(pending) and pending[self.next_extruder][0] <= elapsed:
+            _, make_extruder = pending[self.next_extruder]
+            self.cnc_extruders.append(make_extruder())
+            self.next_extruder += 1
+
         car_states = {}
-        finished = True
-        for i, extruder in enumerate(self.cnc_extruders):
-            if i * 1 <= elapsed and not extruder.is_finished():
+        finished = self.next_extruder == len(pending)
+        for extruder in self.cnc_extruders:
+            if not extruder.is_finished():
                 instruction_result = extruder.manipulate_drones(game_time)
                 if instruction_result.car_states:
                     car_states.update(instruction_result.car_states)
                 finished = finished and instruction_result.finished
-        if len(car_states):
-            self.game_interface.set_game_state(GameState(cars=car_states))
+        self.batcher.queue_cars(car_states)
         return StepResult(finished=finished)
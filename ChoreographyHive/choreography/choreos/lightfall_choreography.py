@@ -1,11 +1,13 @@
 import math
 
+import numpy as np
+
 from rlbot.agents.base_agent import SimpleControllerState
-from rlbot.utils.game_state_util import GameState, CarState, Physics, Vector3, Rotator, BallState
 from rlbot.utils.structures.game_interface import GameInterface
 
+from choreography.car_state_pool import HIDDEN_BALL, stationary_car_state
 from choreography.choreography import Choreography
-from choreography.drone import slow_to_pos
+from choreography.drone import slow_to_pos_batch
 from choreography.group_step import BlindBehaviorStep, DroneListStep, StepResult, PerDroneStep
 
 
@@ -15,8 +17,7 @@ class LightfallChoreography(Choreography):
     """
 
     def __init__(self, game_interface: GameInterface):
-        super().__init__()
-        self.game_interface = game_interface
+        super().__init__(game_interface)
 
     def generate_sequence(self, drones):
         self.sequence.clear()
@@ -55,10 +56,12 @@ class LightfallChoreography(Choreography):
         radian_spacing = 2 * math.pi / len(drones)
         elapsed = packet.game_info.seconds_elapsed - start_time
         radius = 4000 - elapsed * 100
-        for i, drone in enumerate(drones):
-            progress = i * radian_spacing + elapsed * .5
-            target = [radius * math.sin(progress), radius * math.cos(progress), 0]
-            slow_to_pos(drone, target)
+        progress = np.arange(len(drones)) * radian_spacing + elapsed * .5
+        targets = np.zeros((len(drones), 3))
+        targets[:, 0] = radius * np.sin(progress)
+        targets[:, 1] = radius * np.cos(progress)
+        self.orientations.refresh()
+        slow_to_pos_batch(drones, targets, self.positions, self.velocities, self.orientations.matrices)
         return StepResult(finished=radius < 10)
 
     def line_up(self, packet, drones, start_time) -> StepResult:
@@ -69,13 +72,9 @@ class LightfallChoreography(Choreography):
         y_increment = 100
         start_y = -len(drones) * y_increment / 2
         start_z = 40
-        car_states = {}
-        for drone in drones:
-            car_states[drone.index] = CarState(
-                Physics(location=Vector3(start_x, start_y + drone.index * y_increment, start_z),
-                        velocity=Vector3(0, 0, 0),
-                        rotation=Rotator(0, 0, 0)))
-        self.game_interface.set_game_state(GameState(cars=car_states))
+        car_states = {drone.index: stationary_car_state(start_x, start_y + drone.index * y_increment, start_z)
+                      for drone in drones}
+        self.batcher.queue_cars(car_states)
         return StepResult(finished=True)
 
     def place_near_ceiling(self, packet, drones, start_time) -> StepResult:
@@ -86,14 +85,10 @@ class LightfallChoreography(Choreography):
         y_increment = 100
         start_y = -len(drones) * y_increment / 2
         start_z = 1900
-        car_states = {}
-        for drone in drones:
-            car_states[drone.index] = CarState(
-                Physics(location=Vector3(start_x, start_y + drone.index * y_increment, start_z),
-                        velocity=Vector3(0, 0, 0),
-                        angular_velocity=Vector3(0, 0, 0),
-                        rotation=Rotator(math.pi * 1, 0, 0)))
-        self.game_interface.set_game_state(GameState(cars=car_states))
+        car_states = {drone.index: stationary_car_state(start_x, start_y + drone.index * y_increment, start_z,
+                                                        pitch=math.pi * 1)
+                      for drone in drones}
+        self.batcher.queue_cars(car_states)
         return StepResult(finished=True)
 
     def drift_downward(self, packet, drone, start_time) -> StepResult:
@@ -109,8 +104,5 @@ class LightfallChoreography(Choreography):
         """
         Places the ball above the roof of the arena to keep it out of the way.
         """
-        self.game_interface.set_game_state(GameState(ball=BallState(physics=Physics(
-            location=Vector3(0, 0, 3000),
-            velocity=Vector3(0, 0, 0),
-            angular_velocity=Vector3(0, 0, 0)))))
+        self.batcher.queue_ball(HIDDEN_BALL)
         return StepResult(finished=True)
@@ -1,73 +1,134 @@
+import math
+
 import numpy as np
 from rlbot.agents.base_agent import SimpleControllerState
 
 from rlbot.utils.structures.game_data_struct import Rotator, Vector3, PlayerInfo
 
 
+class LazyOrientations:
+    """
+    Orientation matrices for a group of drones, built from their (N, 3) rotations.
+    They are only recomputed when someone asks for one after the rotations have changed,
+    and then only for the drones whose rotation is different from last time, so ticks
+    where nothing needs orientation (or nothing has turned) don't pay for the trig.
+    """
+
+    def __init__(self, rot: np.ndarray):
+        self.rot = rot
+        self.matrices = np.tile(np.identity(3, dtype=rot.dtype), (len(rot), 1, 1))
+        # The rotations the matrices were built from. NaN never compares equal, so every row starts out changed.
+        self.last_rot = np.full_like(rot, np.nan)
+        # Scratch space for the trig.
+        self.cos = np.empty_like(rot)
+        self.sin = np.empty_like(rot)
+        self.stale = True
+
+    def invalidate(self):
+        """Call whenever the rotations have been updated."""
+        self.stale = True
+
+    def refresh(self):
+        if self.stale:
+            changed = np.any(self.rot != self.last_rot, axis=1)
+            if changed.all():
+                orient_matrix_batch(self.rot, self.matrices, self.cos, self.sin)
+                self.last_rot[:] = self.rot
+            elif changed.any():
+                new_rot = self.rot[changed]
+                self.matrices[changed] = orient_matrix_batch(new_rot, out=np.empty((len(new_rot), 3, 3)))
+                self.last_rot[changed] = new_rot
+            self.stale = False
+
+
 class Drone:
     def __init__(self, index: int, team: int):
         self.index: int = index
         self.team: int = team
-        self.pos: np.ndarray = np.zeros(3)
-        self.rot: np.ndarray = np.zeros(3)
-        self.vel: np.ndarray = np.zeros(3)
+        # float32 to match the packet.
+        self.pos: np.ndarray = np.zeros(3, dtype=np.float32)
+        self.rot: np.ndarray = np.zeros(3, dtype=np.float32)
+        self.vel: np.ndarray = np.zeros(3, dtype=np.float32)
         self.boost: float = 0.0
         self.time: float = 0.0
-        self.orient_m: np.ndarray = np.identity(3)
+        self._orient_m: np.ndarray = np.identity(3, dtype=np.float32)
+        self.orientations: LazyOrientations = None
         self.ctrl: SimpleControllerState = SimpleControllerState()
 
+    @property
+    def orient_m(self) -> np.ndarray:
+        """Orientation matrix. When the drone is part of a batch, the batch is brought up to date first."""
+        if self.orientations is not None:
+            self.orientations.refresh()
+        return self._orient_m
+
+    @orient_m.setter
+    def orient_m(self, value: np.ndarray):
+        self._orient_m = value
+
     def update(self, game_car: PlayerInfo, time: float):
-        self.pos = a3v(game_car.physics.location)
-        self.rot = a3r(game_car.physics.rotation)
-        self.vel = a3v(game_car.physics.velocity)
+        # pos, rot, vel, and orient_m are filled for all drones at once by the hivemind.
         self.boost = game_car.boost
-        self.orient_m = orient_matrix(self.rot)
         self.time = time
 
     def reset_ctrl(self):
         self.ctrl = SimpleControllerState()
 
 
+def special_sauce(x: float, a: float) -> float:
+    """Modified sigmoid to smooth out steering.
+
+    Arguments:
+        x {float} -- Input, usually an angle.
+        a {float} -- Steepness. Negative values give a positive output for positive x.
+
+    Returns:
+        float -- Value between -1 and 1.
+    """
+    # Graph: https://www.geogebra.org/m/udfp2zcy
+    # Same curve as 2 / (1 + exp(a * x)) - 1.
+    return -math.tanh(0.5 * a * x)
+
+
+def special_sauce_batch(x: np.ndarray, a: float) -> np.ndarray:
+    """Same as special_sauce, but for an array of inputs at once.
+
+    Arguments:
+        x {np.ndarray} -- Inputs, usually angles.
+        a {float} -- Steepness.
+
+    Returns:
+        np.ndarray -- Values between -1 and 1.
+    """
+    return -np.tanh(0.5 * a * x)
+
+
 def seek_pos(drone, position, max_speed=1410):
     """
     Tries to intelligently drive so it stops at a given position.
     """
 
-    # Get speed.
-    speed = np.linalg.norm(drone.vel)
+    # Get squared speed.
+    vel = drone.vel
+    speed_sq = vel[0] * vel[0] + vel[1] * vel[1] + vel[2] * vel[2]
 
     # Simplified speed controller.
-    if speed < max_speed:
+    if speed_sq < max_speed * max_speed:
         drone.ctrl.throttle = 1.0
     else:
         drone.ctrl.throttle = 0.0
 
-    def special_sauce(x, a):
-        """Modified sigmoid to smooth out steering."""
-        # Graph: https://www.geogebra.org/m/udfp2zcy
-        return 2 / (1 + np.exp(a * x)) - 1
-
-    # Calculates the 2D angle to the position. Positive is clockwise.
-    local_target = local(drone.orient_m, drone.pos, position)
-    angle = np.arctan2(local_target[1], local_target[0])
-
-    # Calculates steer.
-    drone.ctrl.steer = special_sauce(angle, -5)
+    # Calculates steer from the 2D angle to the position.
+    drone.ctrl.steer = local_steer(drone.orient_m, drone.pos, position, -5)
 
 
 def slow_to_pos(drone, position):
     # Calculate distance and velocity.
-    distance = np.linalg.norm(position - drone.pos)
-    velocity = np.linalg.norm(drone.vel)
-    # Calculates the target position in local coordinates.
-    local_target = local(drone.orient_m, drone.pos, position)
-    # Finds 2D angle to target. Positive is clockwise.
-    angle = np.arctan2(local_target[1], local_target[0])
-
-    def special_sauce(x, a):
-        """Modified sigmoid to smooth out steering."""
-        # Graph: https://www.geogebra.org/m/udfp2zcy
-        return 2 / (1 + np.exp(a * x)) - 1
+    distance = norm3(position, drone.pos)
+    vel = drone.vel
+    velocity = math.sqrt(vel[0] * vel[0] + vel[1] * vel[1] + vel[2] * vel[2])
+    # Finds 2D angle to target in local coordinates. Positive is clockwise.
+    angle = local_angle(drone.orient_m, drone.pos, position)
 
     # Calculates steer.
     drone.ctrl.steer = special_sauce(angle, -5)
@@ -84,6 +145,41 @@ def slow_to_pos(drone, position):
             drone.ctrl.boost = True
 
 
+def slow_to_pos_batch(drones, targets: np.ndarray, pos: np.ndarray, vel: np.ndarray, orient_m: np.ndarray):
+    """Same as slow_to_pos, but works out the steering for every drone in one go.
+
+    Arguments:
+        drones {List[Drone]} -- Drones to control.
+        targets {np.ndarray} -- Target position of each drone, shape (N, 3).
+        pos {np.ndarray} -- Position of each drone, shape (N, 3).
+        vel {np.ndarray} -- Velocity of each drone, shape (N, 3).
+        orient_m {np.ndarray} -- Orientation matrix of each drone, shape (N, 3, 3).
+    """
+    to_targets = targets - pos
+    distances = np.sqrt(np.einsum('ij,ij->i', to_targets, to_targets))
+    velocities = np.sqrt(np.einsum('ij,ij->i', vel, vel))
+    # Calculates the target positions in local coordinates.
+    local_targets = np.einsum('nji,nj->ni', orient_m, to_targets)
+    # Finds 2D angles to targets. Positive is clockwise.
+    angles = np.arctan2(local_targets[:, 1], local_targets[:, 0])
+    steers = special_sauce_batch(angles, -5)
+    throttles = np.clip(0.3 * distances - 0.2 * velocities, -1.0, 1.0)
+
+    for i, drone in enumerate(drones):
+        drone.ctrl.steer = steers[i]
+
+        # Throttle controller.
+        if abs(angles[i]) > 2:
+            # If I'm facing the wrong way, do a little drift.
+            drone.ctrl.throttle = 1.0
+            drone.ctrl.handbrake = True
+        elif distances[i] > 100:
+            # A simple PD controller to stop at target.
+            drone.ctrl.throttle = throttles[i]
+            if distances[i] > 1000:
+                drone.ctrl.boost = True
+
+
 def slow_to_pos2(drone, position):
     """
     Tries to intelligently drive so it stops at a given position.
@@ -92,17 +188,13 @@ def slow_to_pos2(drone, position):
     TURN_SLOW = 300 # Maximum speed slowdown for turning.
     STOP_DIS = 40 # Stops if closer than this.
 
-    def special_sauce(x, a):
-        """Modified sigmoid function."""
-        return 2 / (1 + np.exp(a * x)) - 1
-
-    # Get distance and speed.
-    distance = np.linalg.norm(position - drone.pos)
-    speed = np.linalg.norm(drone.vel)
+    # Get distance and squared speed.
+    distance = norm3(position, drone.pos)
+    vel = drone.vel
+    speed_sq = vel[0] * vel[0] + vel[1] * vel[1] + vel[2] * vel[2]
 
     # Calculates the 2D angle to the position. Positive is clockwise.
-    local_target = local(drone.orient_m, drone.pos, position)
-    angle = np.arctan2(local_target[1], local_target[0])
+    angle = local_angle(drone.orient_m, drone.pos, position)
 
     # Calculates steer
     drone.ctrl.steer = special_sauce(angle, -5)
@@ -114,7 +206,8 @@ def slow_to_pos2(drone, position):
     desired_speed = cap(desired_speed, 0.0, 2300.0)
 
     # Simplified speed controller.
-    if speed < desired_speed and distance > STOP_DIS:
+    # desired_speed is never negative, so comparing squares is fine.
+    if speed_sq < desired_speed * desired_speed and distance > STOP_DIS:
         drone.ctrl.throttle = 1.0
     else:
         drone.ctrl.throttle = 0.0
@@ -124,10 +217,8 @@ def turn_to_pos(drone, position, game_time):
     # Wiggle rate per second.
     RATE = 0.2
 
-    # Calculates the target position in local coordinates.
-    local_target = local(drone.orient_m, drone.pos, position)
-    # Finds 2D angle to target. Positive is clockwise.
-    angle = np.arctan2(local_target[1], local_target[0])
+    # Finds 2D angle to target in local coordinates. Positive is clockwise.
+    angle = local_angle(drone.orient_m, drone.pos, position)
 
     # Toggles forward.
     drone.forward = round(game_time / RATE) % 2
@@ -142,18 +233,8 @@ def turn_to_pos(drone, position, game_time):
 
 
 def fast_to_pos(drone, position):
-    # Calculates the target position in local coordinates.
-    local_target = local(drone.orient_m, drone.pos, position)
-    # Finds 2D angle to target. Positive is clockwise.
-    angle = np.arctan2(local_target[1], local_target[0])
-
-    def special_sauce(x, a):
-        """Modified sigmoid to smooth out steering."""
-        # Graph: https://www.geogebra.org/m/udfp2zcy
-        return 2 / (1 + np.exp(a * x)) - 1
-
     # Control towards hit position. Fully boosting.
-    drone.ctrl.steer = special_sauce(angle, -5)
+    drone.ctrl.steer = local_steer(drone.orient_m, drone.pos, position, -5)
     drone.ctrl.throttle = 1.0
     drone.ctrl.boost = True
 
@@ -169,7 +250,63 @@ def local(A: np.ndarray, p0: np.ndarray, p1: np.ndarray) -> np.ndarray:
     Returns:
         np.ndarray -- Local x, y, and z coordinates.
     """
-    return np.dot(A.T, p1 - p0)
+    d0 = p1[0] - p0[0]
+    d1 = p1[1] - p0[1]
+    d2 = p1[2] - p0[2]
+    return np.array((A[0, 0] * d0 + A[1, 0] * d1 + A[2, 0] * d2,
+                     A[0, 1] * d0 + A[1, 1] * d1 + A[2, 1] * d2,
+                     A[0, 2] * d0 + A[1, 2] * d1 + A[2, 2] * d2))
+
+
+def local_angle(A: np.ndarray, p0: np.ndarray, p1: np.ndarray) -> float:
+    """Finds the 2D angle to a point in local coordinates. Positive is clockwise.
+
+    Arguments:
+        A {np.ndarray} -- The local orientation matrix.
+        p0 {np.ndarray} -- World x, y, and z coordinates of the start point for the vector.
+        p1 {np.ndarray} -- World x, y, and z coordinates of the end point for the vector.
+
+    Returns:
+        float -- Angle in radians, between -pi and pi.
+    """
+    # Only the x and y rows of local() are needed.
+    d0 = p1[0] - p0[0]
+    d1 = p1[1] - p0[1]
+    d2 = p1[2] - p0[2]
+    x = A[0, 0] * d0 + A[1, 0] * d1 + A[2, 0] * d2
+    y = A[0, 1] * d0 + A[1, 1] * d1 + A[2, 1] * d2
+    return math.atan2(y, x)
+
+
+def local_steer(A: np.ndarray, p0: np.ndarray, p1: np.ndarray, a: float) -> float:
+    """Steer towards a point, i.e. special_sauce of its local_angle, in a single call.
+
+    Arguments:
+        A {np.ndarray} -- The local orientation matrix.
+        p0 {np.ndarray} -- World x, y, and z coordinates of the start point for the vector.
+        p1 {np.ndarray} -- World x, y, and z coordinates of the end point for the vector.
+        a {float} -- Steepness, as in special_sauce.
+
+    Returns:
+        float -- Steer between -1 and 1.
+    """
+    return special_sauce(local_angle(A, p0, p1), a)
+
+
+def norm3(a: np.ndarray, b: np.ndarray) -> float:
+    """Distance between two points.
+
+    Arguments:
+        a {np.ndarray} -- World x, y, and z coordinates of the first point.
+        b {np.ndarray} -- World x, y, and z coordinates of the second point.
+
+    Returns:
+        float -- The distance between them.
+    """
+    dx = a[0] - b[0]
+    dy = a[1] - b[1]
+    dz = a[2] - b[2]
+    return math.sqrt(dx * dx + dy * dy + dz * dz)
 
 
 def cap(value: float, minimum: float, maximum: float) -> float:
@@ -191,18 +328,6 @@ def cap(value: float, minimum: float, maximum: float) -> float:
         return value
 
 
-def a3l(l: list) -> np.ndarray:
-    """Converts list to numpy array.
-
-    Arguments:
-        L {list} -- The list to convert containing 3 elements.
-
-    Returns:
-        np.array -- Numpy array with the same contents as the list.
-    """
-    return np.array([l[0], l[1], l[2]])
-
-
 def a3r(r: Rotator) -> np.ndarray:
     """Converts rotator to numpy array.
 
@@ -212,7 +337,7 @@ def a3r(r: Rotator) -> np.ndarray:
     Returns:
         np.ndarray -- Numpy array with the same contents as the rotator.
     """
-    return np.array([r.pitch, r.yaw, r.roll])
+    return np.array((r.pitch, r.yaw, r.roll), dtype=np.float32)
 
 
 def a3v(v: Vector3) -> np.ndarray:
@@ -224,7 +349,7 @@ def a3v(v: Vector3) -> np.ndarray:
     Returns:
         np.ndarray -- Numpy array with the same contents as the vector3.
     """
-    return np.array([v.x, v.y, v.z])
+    return np.array((v.x, v.y, v.z), dtype=np.float32)
 
 
 def normalise(V : np.ndarray) -> np.ndarray:
@@ -236,9 +361,9 @@ def normalise(V : np.ndarray) -> np.ndarray:
     Returns:
         np.ndarray -- Normalised vector.
     """
-    magnitude = np.linalg.norm(V)
-    if magnitude != 0.0:
-        return V / magnitude
+    magnitude_sq = V[0]*V[0] + V[1]*V[1] + V[2]*V[2]
+    if magnitude_sq != 0.0:
+        return V * (1.0 / math.sqrt(magnitude_sq))
     else:
         return V
 
@@ -257,14 +382,14 @@ def orient_matrix(R: np.ndarray) -> np.ndarray:
     yaw: float = R[1]
     roll: float = R[2]
 
-    CR: float = np.cos(roll)
-    SR: float = np.sin(roll)
-    CP: float = np.cos(pitch)
-    SP: float = np.sin(pitch)
-    CY: float = np.cos(yaw)
-    SY: float = np.sin(yaw)
+    CR: float = math.cos(roll)
+    SR: float = math.sin(roll)
+    CP: float = math.cos(pitch)
+    SP: float = math.sin(pitch)
+    CY: float = math.cos(yaw)
+    SY: float = math.sin(yaw)
 
-    A = np.zeros((3, 3))
+    A = np.empty((3, 3))
 
     # front direction
     A[0, 0] = CP * CY
@@ -282,3 +407,44 @@ def orient_matrix(R: np.ndarray) -> np.ndarray:
     A[2, 2] = CP * CR
 
     return A
+
+
+def orient_matrix_batch(R: np.ndarray, out: np.ndarray, C: np.ndarray = None, S: np.ndarray = None) -> np.ndarray:
+    """Converts from Euler angles to orientation matrices for many objects at once.
+
+    Arguments:
+        R {np.ndarray} -- Pitch, yaw, and roll of shape (N, 3).
+        out {np.ndarray} -- Array of shape (N, 3, 3) which receives the orientation matrices.
+        C {np.ndarray} -- Optional scratch array shaped like R for the cosines, to avoid allocating one.
+        S {np.ndarray} -- Optional scratch array shaped like R for the sines.
+
+    Returns:
+        np.ndarray -- out, filled with an orientation matrix per object.
+    """
+    # One cos and one sin call for every angle of every object.
+    C = np.cos(R, out=C)
+    S = np.sin(R, out=S)
+
+    CP = C[:, 0]
+    SP = S[:, 0]
+    CY = C[:, 1]
+    SY = S[:, 1]
+    CR = C[:, 2]
+    SR = S[:, 2]
+
+    # front direction
+    out[:, 0, 0] = CP * CY
+    out[:, 1, 0] = CP * SY
+    out[:, 2, 0] = SP
+
+    # right direction
+    out[:, 0, 1] = CY * SP * SR - CR * SY
+    out[:, 1, 1] = SY * SP * SR + CR * CY
+    out[:, 2, 1] = -CP * SR
+
+    # up direction
+    out[:, 0, 2] = -CR * CY * SP - SR * SY
+    out[:, 1, 2] = -CR * SY * SP + SR * CY
+    out[:, 2, 2] = CP * CR
+
+    return out
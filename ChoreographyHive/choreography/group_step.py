@@ -7,11 +7,15 @@ from choreography.drone import Drone
 
 
 class StepResult:
+    __slots__ = ('finished',)
+
     def __init__(self, finished: bool = False):
         self.finished = finished
 
 
 class GroupStep:
+    __slots__ = ()
+
     def perform(self, packet: GameTickPacket, drones: List[Drone]) -> StepResult:
         pass
 
@@ -22,12 +26,14 @@ class DroneListStep(GroupStep):
     convenient than PerDroneStep. It should be possible to accomplish almost anything
     with this one.
     """
+    __slots__ = ('fn', 'start_time')
+
     def __init__(self, fn: Callable[[GameTickPacket, List[Drone], float], StepResult]):
         self.fn = fn
         self.start_time = None
 
     def perform(self, packet, drones):
-        if not self.start_time:
+        if self.start_time is None:
             self.start_time = packet.game_info.seconds_elapsed
         return self.fn(packet, drones, self.start_time)
 
@@ -37,16 +43,19 @@ class PerDroneStep(GroupStep):
     Takes a function and applies it to every drone individually. They can still behave differently
     because you have access to the drone's index, position, velocity, etc.
     """
+    __slots__ = ('bot_fn', 'max_duration', 'start_time')
+
     def __init__(self, bot_fn: Callable[[GameTickPacket, Drone, float], StepResult], max_duration: float):
         self.bot_fn = bot_fn
         self.max_duration = max_duration
         self.start_time = None
 
     def perform(self, packet, drones: List[Drone]):
-        if not self.start_time:
-            self.start_time = packet.game_info.seconds_elapsed
+        game_time = packet.game_info.seconds_elapsed
+        if self.start_time is None:
+            self.start_time = game_time
 
-        if packet.game_info.seconds_elapsed > self.start_time + self.max_duration:
+        if game_time > self.start_time + self.max_duration:
             return StepResult(finished=True)
 
         finished = True
@@ -62,6 +71,8 @@ class BlindBehaviorStep(PerDroneStep):
     For every drone in the list, output the given controls for the specified duration.
     For example you could make everyone to boost simultaneously for .5 seconds.
     """
+    __slots__ = ('controls',)
+
     def __init__(self, controls: SimpleControllerState, duration: float):
         super().__init__(self.blind, duration)
         self.controls = controls
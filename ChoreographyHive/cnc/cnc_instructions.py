@@ -8,6 +8,9 @@ from rlbot.utils.game_state_util import GameState, CarState, Vector3, Physics, R
 from choreography.drone import Drone
 from util.vec import Vec3
 
+# Extruding drones are pitched nose up.
+NOZZLE_ROTATION = Rotator(math.pi / 2, 0, 0)
+
 
 @dataclass
 class StateAndControls:
@@ -96,17 +99,16 @@ class CncExtruder:
         return self.step_index >= len(self.bot_cnc.list)
 
     def arrange_drones(self, extruder_position: Vec3, velocity: Vec3, game_time: float) -> Dict[int, CarState]:
+        velocity_setter = velocity.to_setter()
+        x, y, z = extruder_position.x, extruder_position.y, extruder_position.z
+
         car_states: Dict[int, CarState] = {}
         for i, drone in enumerate(self.drones):
             x_offset = i * 100
-            car_state = CarState(physics=Physics())
-            car_state.physics.velocity = velocity.to_setter()
-            car_state.physics.location = Vector3(
-                extruder_position.x + x_offset,
-                extruder_position.y,
-                extruder_position.z)
-            car_state.physics.rotation = Rotator(math.pi / 2, 0, 0)
-            car_states[drone.index] = car_state
+            car_states[drone.index] = CarState(physics=Physics(
+                location=Vector3(x + x_offset, y, z),
+                velocity=velocity_setter,
+                rotation=NOZZLE_ROTATION))
         return car_states
 
     def manipulate_drones(self, game_time: float) -> InstructionResult:
@@ -119,7 +121,7 @@ class CncExtruder:
                 step.drone_action(drone)
 
         if step.motion_track:
-            if self.step_start_time:
+            if self.step_start_time is not None:
                 elapsed = game_time - self.step_start_time
                 progression = elapsed / (step.motion_track.total_time + .00001)  # Avoid division by zero
                 if progression < 1:
@@ -3,14 +3,22 @@
 from rlbot.utils.structures.bot_input_struct import PlayerInput
 from rlbot.agents.base_agent import SimpleControllerState
 from rlbot.utils.logging_utils import get_logger
-from rlbot.utils.structures.game_data_struct import GameTickPacket, FieldInfoPacket
+from rlbot.utils.structures.game_data_struct import GameTickPacket, FieldInfoPacket, PlayerInfo, Physics
 from rlbot.utils.structures.game_interface import GameInterface
 
+import ctypes
 import time
 
-from choreography.drone import Drone
+import numpy as np
+
+from choreography.drone import Drone, LazyOrientations
 from queue_commands import QCommand
 
+# Rocket League sends a new packet 120 times a second.
+TICK_DURATION = 1 / 120
+# How early to wake up before the next packet is due, to make up for sleep being imprecise.
+TICK_MARGIN = 0.002
+
 class Hivemind:
     """
     Sends and receives data from Rocket League, and maintains the list of drones.
@@ -31,7 +39,18 @@ class Hivemind:
 
         self.drones = []
 
+        # Every drone's position, rotation, velocity, and orientation matrix, one row per drone.
+        # The arrays on each Drone are views into these. The packet stores float32, so do we.
+        self.pos = np.zeros((0, 3), dtype=np.float32)
+        self.rot = np.zeros((0, 3), dtype=np.float32)
+        self.vel = np.zeros((0, 3), dtype=np.float32)
+        self.orientations = LazyOrientations(self.rot)
+
+        # One PlayerInput per drone, reused every tick.
+        self.player_inputs = []
+
         self.choreo = choreo_obj(self.game_interface)
+        self.share_arrays()
         self.choreo.generate_sequence(self.drones)
 
         # Set up queue to know when to stop and reload.
@@ -67,44 +86,112 @@ class Hivemind:
 
         # Creating packet which will be updated every tick.
         packet = GameTickPacket()
+        game_time = packet.game_info.seconds_elapsed
+
+        # Numpy views onto the packet's memory.
+        car_locations = car_physics_view(packet, 'location')
+        car_rotations = car_physics_view(packet, 'rotation')
+        car_velocities = car_physics_view(packet, 'velocity')
+
+        loop_check = self.loop_check
+        update_packet = self.game_interface.update_live_data_packet
+        step_tick = self.step_tick
 
         # MAIN LOOP:
-        while self.loop_check():
+        while loop_check():
             #print('test')
 
-            prev_time = packet.game_info.seconds_elapsed
+            prev_time = game_time
             # Updating the game tick packet.
-            self.game_interface.update_live_data_packet(packet)
+            update_packet(packet)
+
+            game_time = packet.game_info.seconds_elapsed
 
             # Checking if packet is new, otherwise sleep.
-            if prev_time == packet.game_info.seconds_elapsed:
+            if prev_time == game_time:
                 time.sleep(0.001)
                 continue
+            tick_start = time.monotonic()
 
-            # Create a Drone object for every drone that holds its information.
-            if packet.num_cars > len(self.drones):
-                # Clears the list if there are more cars than drones.
-                self.drones.clear()
-                for index in range(packet.num_cars):
-                    self.drones.append(Drone(index, packet.game_cars[index].team))
-
-            # Processing drone data.
-            for drone in self.drones:
-                drone.update(packet.game_cars[drone.index], packet.game_info.seconds_elapsed)
-
-            # Steps through the choreography.
-            self.choreo.step(packet, self.drones)
+            step_tick(packet, game_time, car_locations, car_rotations, car_velocities)
 
-            # Resets choreography once it has finished.
-            if self.choreo.finished:
-                # Re-instantiates the choreography.
-                self.choreo = self.choreo.__class__(self.game_interface)
-                self.choreo.generate_sequence(self.drones)
+            # Sleeps until just before the next packet is due.
+            sleep_for = tick_start + TICK_DURATION - TICK_MARGIN - time.monotonic()
+            if sleep_for > 0:
+                time.sleep(sleep_for)
 
-            # Sends the drone inputs to the drones.
-            for drone in self.drones:
-                self.game_interface.update_player_input(
-                    convert_player_input(drone.ctrl), drone.index)
+    def step_tick(self, packet: GameTickPacket, game_time: float, car_locations: np.ndarray,
+                  car_rotations: np.ndarray, car_velocities: np.ndarray):
+        """
+        Does all the work for one new packet: updates the drones, steps the choreography and
+        sends the inputs. The car_* arguments are the views made by car_physics_view.
+        """
+        # Create a Drone object for every drone that holds its information.
+        if packet.num_cars > len(self.drones):
+            # Recreates the list if there are more cars than drones.
+            self.create_drones(packet)
+
+        # Nothing to control yet, so there is nothing to update, step, or send.
+        if not self.drones:
+            return
+
+        # Processing drone data. Drone indices match the array rows.
+        num_drones = len(self.drones)
+        self.pos[:] = car_locations[:num_drones]
+        self.rot[:] = car_rotations[:num_drones]
+        self.vel[:] = car_velocities[:num_drones]
+        game_cars = packet.game_cars
+        for drone in self.drones:
+            drone.update(game_cars[drone.index], game_time)
+        # Orientation matrices are rebuilt when first asked for.
+        self.orientations.invalidate()
+
+        # Steps through the choreography.
+        self.choreo.step(packet, self.drones)
+
+        # Resets choreography once it has finished.
+        if self.choreo.finished:
+            # Re-instantiates the choreography.
+            self.choreo = self.choreo.__class__(self.game_interface)
+            self.share_arrays()
+            self.choreo.generate_sequence(self.drones)
+
+        # Sends the drone inputs to the drones.
+        send_input = self.game_interface.update_player_input
+        player_inputs = self.player_inputs
+        for drone in self.drones:
+            send_input(convert_player_input(drone.ctrl, player_inputs[drone.index]), drone.index)
+
+    def create_drones(self, packet: GameTickPacket):
+        """
+        Creates a Drone for every car. Their state lives in contiguous arrays on the hivemind,
+        so it can be processed for all drones at once.
+        """
+        num_cars = packet.num_cars
+        self.pos = np.zeros((num_cars, 3), dtype=np.float32)
+        self.rot = np.zeros((num_cars, 3), dtype=np.float32)
+        self.vel = np.zeros((num_cars, 3), dtype=np.float32)
+        self.orientations = LazyOrientations(self.rot)
+        self.player_inputs = [PlayerInput() for _ in range(num_cars)]
+
+        game_cars = packet.game_cars
+        self.drones.clear()
+        for index in range(num_cars):
+            drone = Drone(index, game_cars[index].team)
+            # Rows are views, so filling our arrays in place updates the drones too.
+            drone.pos = self.pos[index]
+            drone.rot = self.rot[index]
+            drone.vel = self.vel[index]
+            drone.orient_m = self.orientations.matrices[index]
+            drone.orientations = self.orientations
+            self.drones.append(drone)
+        self.share_arrays()
+
+    def share_arrays(self):
+        """Points the choreography's positions, velocities and orientations at ours."""
+        self.choreo.positions = self.pos
+        self.choreo.velocities = self.vel
+        self.choreo.orientations = self.orientations
 
     def loop_check(self):
         """
@@ -118,11 +205,26 @@ class Hivemind:
             return message != QCommand.STOP
 
 
-def convert_player_input(ctrl: SimpleControllerState) -> PlayerInput:
+def car_physics_view(packet: GameTickPacket, field: str) -> np.ndarray:
+    """
+    Returns a (MAX_PLAYERS, 3) float32 view of one Physics field ('location', 'rotation', 'velocity'
+    or 'angular_velocity') of every car in the packet. It shares memory with the packet, so it
+    stays up to date whenever the packet is updated.
+    """
+    cars = packet.game_cars
+    offset = PlayerInfo.physics.offset + getattr(Physics, field).offset
+    raw = (ctypes.c_char * ctypes.sizeof(cars)).from_buffer(cars)
+    return np.ndarray((len(cars), 3), dtype=np.float32, buffer=raw, offset=offset,
+                      strides=(ctypes.sizeof(PlayerInfo), ctypes.sizeof(ctypes.c_float)))
+
+
+def convert_player_input(ctrl: SimpleControllerState, player_input: PlayerInput = None) -> PlayerInput:
     """
     Converts a SimpleControllerState to a PlayerInput object.
+    If a PlayerInput is given it is overwritten in place instead of allocating a new one.
     """
-    player_input = PlayerInput()
+    if player_input is None:
+        player_input = PlayerInput()
     player_input.throttle = ctrl.throttle
     player_input.steer = ctrl.steer
     player_input.pitch = ctrl.pitch
@@ -16,6 +16,7 @@ class Vec3:
 
     When in doubt visit the wiki: https://github.com/RLBot/RLBot/wiki/Useful-Game-Values
     """
+    __slots__ = ('x', 'y', 'z')
 
     def __init__(self, x: float or 'Vec3'=0, y: float=0, z: float=0):
         """